@@ -0,0 +1,54 @@
+# cython: language_level=3
+"""
+Compiled version of file_processor.flatten_json_object.
+
+It mirrors the pure-Python implementation line for line, with typed locals
+so the stack walk and key concatenation run without interpreter overhead.
+file_processor imports it when it has been built and falls back to the
+Python version otherwise. Build it in place from app/server with:
+
+    uv run cython core/_flatten.pyx
+    cc -shared -fPIC -O2 $(python3-config --includes) core/_flatten.c \
+        -o core/_flatten$(python3-config --extension-suffix)
+"""
+
+from sys import intern
+
+from .constants import NESTED_FIELD_DELIMITER, LIST_INDEX_DELIMITER
+
+
+cpdef dict flatten_json_object(object obj, str parent_key='', str delimiter=NESTED_FIELD_DELIMITER):
+    """
+    Flatten a nested JSON object into a flat dictionary.
+
+    See core.file_processor.flatten_json_object for the full contract.
+    """
+    cdef dict items = {}
+    cdef str index_delimiter = LIST_INDEX_DELIMITER
+    cdef list stack = [(obj, parent_key)]
+    cdef str key, prefix
+    cdef object current, value
+    cdef Py_ssize_t i
+
+    while stack:
+        current, key = stack.pop()
+
+        if isinstance(current, dict):
+            # Handle nested dictionaries; push in reverse so keys keep document order.
+            # Keys are interned so every record shares one string per column name.
+            prefix = key + delimiter if key else ''
+            for child_key, value in reversed((<dict>current).items()):
+                stack.append((value, intern(prefix + child_key)))
+
+        elif isinstance(current, list):
+            # Handle arrays by indexing each item
+            prefix = key + index_delimiter
+            for i in range(len(<list>current) - 1, -1, -1):
+                stack.append(((<list>current)[i], intern(prefix + str(i))))
+
+        else:
+            # Handle primitive types (strings, numbers, booleans, null)
+            # Convert everything to string for consistent storage
+            items[key] = None if current is None else str(current)
+
+    return items
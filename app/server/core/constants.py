@@ -13,6 +13,10 @@ NESTED_FIELD_DELIMITER = "__"
 # Example: {"tags": ["a", "b", "c"]} becomes {"tags_0": "a", "tags_1": "b", "tags_2": "c"}
 LIST_INDEX_DELIMITER = "_"
 
+# Column holding the original record as JSON text when a JSONL upload only flattens selected paths
+# Example: SELECT json_extract(raw_json, '$.user.email') FROM events
+RAW_JSON_COLUMN = "raw_json"
+
 """
 Delimiter Usage Rationale:
 
@@ -0,0 +1,81 @@
+"""
+SQLite connection helpers.
+
+Uploads replace whole tables from a file the user still has, so ingest
+connections trade some durability for write throughput. A single ingest
+connection is kept open per process and shared between request threads.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Location of the application database
+DATABASE_PATH = "db/database.db"
+
+# Seconds a writer waits for another process's ingest transaction to finish
+INGEST_BUSY_TIMEOUT = 60.0
+
+# PRAGMAs applied to every ingest connection before any writes.
+# The connection is long-lived, so it must not take locking_mode=EXCLUSIVE:
+# that would lock out the query connections for the life of the process.
+INGEST_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+)
+
+_ingest_conn: Optional[sqlite3.Connection] = None
+_ingest_lock = threading.Lock()
+
+
+def open_ingest_conn(path: str = DATABASE_PATH) -> sqlite3.Connection:
+    """
+    Open a SQLite connection tuned for bulk table loads.
+
+    Args:
+        path: Path to the SQLite database file
+
+    Returns:
+        sqlite3.Connection: Connection with WAL journaling, relaxed fsync,
+        in-memory temp storage and a 64MB page cache. It may be used from
+        any thread; callers serialize access through ingest_connection().
+        Writers in other processes queue behind INGEST_BUSY_TIMEOUT.
+    """
+    conn = sqlite3.connect(path, timeout=INGEST_BUSY_TIMEOUT, check_same_thread=False)
+    for pragma in INGEST_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+@contextmanager
+def ingest_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow the shared ingest connection, opening it on first use.
+
+    The connection is held exclusively for the duration of the block,
+    since SQLite serializes writers anyway. It is not closed on exit.
+
+    Example:
+        with ingest_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            ...
+    """
+    global _ingest_conn
+    with _ingest_lock:
+        if _ingest_conn is None:
+            _ingest_conn = open_ingest_conn(DATABASE_PATH)
+        yield _ingest_conn
+
+
+def close_ingest_conn() -> None:
+    """
+    Close the shared ingest connection; the next ingest reopens it.
+    """
+    global _ingest_conn
+    with _ingest_lock:
+        if _ingest_conn is not None:
+            _ingest_conn.close()
+            _ingest_conn = None
@@ -1,15 +1,262 @@
-import json
+import asyncio
+import csv
+import multiprocessing
+import os
 import pandas as pd
 import sqlite3
 import io
 import re
-from typing import Dict, Any, List, Set
+from sys import intern
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from concurrent.futures.process import BrokenProcessPool
+from itertools import chain, islice
+from typing import Callable, Dict, Any, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import json
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speedup
+    # The stdlib module exposes the same loads()/JSONDecodeError API and also accepts bytes
+    import json as orjson
+
 from .sql_security import (
-    execute_query_safely,
     validate_identifier,
+    escape_identifier,
     SQLSecurityError
 )
-from .constants import NESTED_FIELD_DELIMITER, LIST_INDEX_DELIMITER
+from .constants import NESTED_FIELD_DELIMITER, LIST_INDEX_DELIMITER, RAW_JSON_COLUMN
+from . import db
+from .db import ingest_connection
+
+# Number of rows handed to a single executemany() call during ingest
+INSERT_BATCH_SIZE = 10_000
+
+# Number of rows returned as sample data for an uploaded table
+SAMPLE_SIZE = 5
+
+# CSV uploads larger than this many bytes are parsed and loaded in chunks
+# of CSV_CHUNK_SIZE rows, so peak memory is bounded by the chunk size
+CSV_CHUNK_THRESHOLD = 64 * 1024 * 1024
+CSV_CHUNK_SIZE = 100_000
+
+# Characters not allowed in table and column names (spaces, hyphens and other non-identifier chars)
+_SAFE_NAME_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+# Required leading character of a table name
+_LEAD_RE = re.compile(r'^[a-zA-Z_]')
+
+# A run of digits long enough to be an integer outside the signed 64-bit range,
+# which orjson would decode as a float
+_WIDE_INT_RE = re.compile(rb'\d{19,}')
+
+def _json_loads(content: bytes) -> Any:
+    """
+    Decode JSON with orjson, falling back to the stdlib json module.
+
+    The stdlib decoder is used whenever orjson would give a different
+    result: for integers too wide for 64 bits (which orjson turns into
+    floats) and for the NaN/Infinity literals orjson rejects.
+    """
+    if not _WIDE_INT_RE.search(content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+def _clean_names(columns: pd.Index) -> pd.Index:
+    """
+    Lowercase column names and replace non-identifier characters with underscores
+    """
+    return columns.astype(str).str.lower().str.replace(_SAFE_NAME_RE, '_', regex=True)
+
+def _clean_columns(df: pd.DataFrame) -> None:
+    """
+    Clean column names in place (see _clean_names)
+    """
+    df.columns = _clean_names(df.columns)
+
+def _sqlite_type(dtype) -> str:
+    """
+    Map a pandas dtype to the SQLite column type used when creating tables
+    """
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return "TEXT"
+
+def _quote_column(column: str) -> str:
+    """
+    Quote a column name for use in DDL/DML statements
+    """
+    return '"' + str(column).replace('"', '""') + '"'
+
+def _load_rows(conn: sqlite3.Connection, table_name: str, columns: List[Tuple[str, str]], rows: Iterable[tuple]) -> int:
+    """
+    Replace table_name with a table of the given (name, type) columns holding rows.
+
+    Rows are inserted with batched executemany() calls inside a single
+    transaction, so the journaling cost is paid once per upload instead of
+    once per row. Rows are consumed lazily, so a streaming source keeps memory
+    bounded. Any secondary indexes must be created after this returns so they
+    are built once rather than row by row.
+
+    Returns:
+        The number of rows written
+    """
+    validate_identifier(table_name, "table")
+    table = escape_identifier(table_name)
+
+    column_defs = ', '.join(f"{_quote_column(name)} {sql_type}" for name, sql_type in columns)
+    placeholders = ', '.join('?' * len(columns))
+    insert_sql = f"INSERT INTO {table} VALUES ({placeholders})"
+
+    row_count = 0
+    rows = iter(rows)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"CREATE TABLE {table} ({column_defs})")
+
+        cursor = conn.cursor()
+        while True:
+            batch = list(islice(rows, INSERT_BATCH_SIZE))
+            if not batch:
+                break
+            cursor.executemany(insert_sql, batch)
+            row_count += len(batch)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return row_count
+
+def _frame_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    Map each DataFrame column to its SQLite column type
+    """
+    return {col: _sqlite_type(dtype) for col, dtype in df.dtypes.items()}
+
+def _column_kind(values: pd.Series) -> str:
+    """
+    Classify a parsed column as 'empty', 'bool', 'integer', 'float' or 'text'
+    """
+    dtype = values.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'bool'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'integer'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'float' if values.notna().any() else 'empty'
+    # pandas reads booleans with missing cells as an object column
+    if pd.api.types.infer_dtype(values, skipna=True) == 'boolean':
+        return 'bool'
+    return 'text'
+
+def _widened_schema(frames: Iterable[pd.DataFrame]) -> Tuple[Dict[str, str], Set[str]]:
+    """
+    Settle each column's SQLite type over every frame, as if parsed in one go.
+
+    pandas widens a column holding integers and floats (or missing cells) to
+    float, turns booleans with missing cells into an object column, and reads
+    any other mix as strings. The second set holds the columns of that last
+    kind: they must be read as strings in every frame, or a frame holding
+    only numeric-looking values would lose their text (e.g. '007').
+
+    Returns:
+        The schema and the set of columns to read as strings
+    """
+    kinds: Dict[str, Set[str]] = {}
+    has_missing: Set[str] = set()
+    for frame in frames:
+        for col in frame.columns:
+            values = frame[col]
+            kinds.setdefault(col, set()).add(_column_kind(values))
+            if values.hasnans:
+                has_missing.add(col)
+
+    schema: Dict[str, str] = {}
+    text_columns: Set[str] = set()
+    for col, col_kinds in kinds.items():
+        col_kinds.discard('empty')
+        if col_kinds == {'bool'}:
+            schema[col] = 'TEXT' if col in has_missing else 'INTEGER'
+        elif col_kinds <= {'integer', 'float'}:
+            schema[col] = 'INTEGER' if col_kinds == {'integer'} and col not in has_missing else 'REAL'
+        else:
+            schema[col] = 'TEXT'
+            text_columns.add(col)
+    return schema, text_columns
+
+def _write_frames(
+    conn: sqlite3.Connection,
+    frames: Iterable[pd.DataFrame],
+    table_name: str,
+    schema: Optional[Dict[str, str]] = None
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Replace table_name with the rows of every DataFrame in frames.
+
+    The table is created with the given schema, or from the columns and
+    dtypes of the first frame when none is given. Frames are consumed one
+    at a time, so a chunked reader keeps memory bounded by its chunk size.
+
+    Returns:
+        The first frame and the total number of rows written
+    """
+    frames = iter(frames)
+    first_frame = next(frames, None)
+    if first_frame is None:
+        raise ValueError("No data to write")
+
+    if schema is None:
+        schema = _frame_schema(first_frame)
+
+    rows = chain.from_iterable(
+        frame.itertuples(index=False, name=None)
+        for frame in chain([first_frame], frames)
+    )
+    row_count = _load_rows(conn, table_name, list(schema.items()), rows)
+
+    return first_frame, row_count
+
+def _write_dataframe(conn: sqlite3.Connection, df: pd.DataFrame, table_name: str) -> None:
+    """
+    Replace table_name with the contents of df (see _write_frames)
+    """
+    _write_frames(conn, [df], table_name)
+
+def _sample_rows(conn: sqlite3.Connection, table_name: str) -> List[Dict[str, Any]]:
+    """
+    Read back the first SAMPLE_SIZE rows of table_name.
+
+    Samples come from the table rather than the DataFrame so they hold the
+    values queries will return: booleans as 1/0 and every value under its
+    column's affinity.
+    """
+    cursor = conn.execute(f"SELECT * FROM {escape_identifier(table_name)} LIMIT {SAMPLE_SIZE}")
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+def _summarize(table_name: str, schema: Dict[str, str], row_count: int, sample_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the upload result for a table just written.
+
+    The schema and row count come from the load itself; the sample rows
+    are read back by _sample_rows().
+    """
+    return {
+        'table_name': table_name,
+        'schema': schema,
+        'row_count': row_count,
+        'sample_data': sample_data
+    }
 
 def sanitize_table_name(table_name: str) -> str:
     """
@@ -21,10 +268,10 @@ def sanitize_table_name(table_name: str) -> str:
         table_name = table_name.rsplit('.', 1)[0]
     
     # Replace bad characters with underscores
-    sanitized = re.sub(r'[^a-zA-Z0-9_]', '_', table_name)
+    sanitized = _SAFE_NAME_RE.sub('_', table_name)
     
     # Ensure it starts with a letter or underscore
-    if sanitized and not sanitized[0].isalpha() and sanitized[0] != '_':
+    if sanitized and not _LEAD_RE.match(sanitized):
         sanitized = '_' + sanitized
     
     # Ensure it's not empty
@@ -40,64 +287,100 @@ def sanitize_table_name(table_name: str) -> str:
     
     return sanitized
 
-def convert_csv_to_sqlite(csv_content: bytes, table_name: str) -> Dict[str, Any]:
+def _read_csv_chunks(csv_content: bytes, text_columns: Optional[Set[str]] = None) -> Iterator[pd.DataFrame]:
+    """
+    Parse CSV content into DataFrames with cleaned column names.
+
+    Content up to CSV_CHUNK_THRESHOLD bytes is parsed in one go; larger
+    content is parsed CSV_CHUNK_SIZE rows at a time. Columns named (by
+    cleaned name) in text_columns are read as strings, so a chunk holding
+    only numeric-looking values keeps them exactly as written.
+    """
+    dtype = None
+    if text_columns:
+        header = pd.read_csv(io.BytesIO(csv_content), nrows=0).columns
+        dtype = {raw: str for raw, clean in zip(header, _clean_names(header)) if clean in text_columns}
+
+    if len(csv_content) <= CSV_CHUNK_THRESHOLD:
+        chunks = [pd.read_csv(io.BytesIO(csv_content), dtype=dtype)]
+    else:
+        chunks = pd.read_csv(io.BytesIO(csv_content), dtype=dtype, chunksize=CSV_CHUNK_SIZE, low_memory=True)
+
+    for chunk in chunks:
+        # Clean column names
+        _clean_columns(chunk)
+        yield chunk
+
+def _load_csv_rows(
+    conn: sqlite3.Connection,
+    csv_content: bytes,
+    table_name: str
+) -> Tuple[Dict[str, str], int, List[Dict[str, Any]]]:
+    """
+    Stream CSV content into table_name with the csv module, without pandas.
+
+    Every column is created as TEXT and values are stored exactly as they
+    appear in the file (empty cells stay empty strings). Blank lines are
+    skipped, as pandas does.
+
+    Returns:
+        The table schema, the number of rows written and the sample rows
+    """
+    reader = csv.reader(io.TextIOWrapper(io.BytesIO(csv_content), encoding='utf-8-sig', newline=''))
+
+    # csv.reader yields an empty list for a blank line
+    rows = (row for row in reader if row)
+
+    header = next(rows, None)
+    if not header:
+        raise ValueError("CSV file is empty")
+
+    # Clean column names the same way as _clean_columns
+    schema = {_SAFE_NAME_RE.sub('_', name.lower()): 'TEXT' for name in header}
+    if len(schema) != len(header):
+        raise ValueError("CSV header contains duplicate column names")
+
+    first_rows = list(islice(rows, SAMPLE_SIZE))
+    sample_data = [dict(zip(schema, row)) for row in first_rows]
+
+    row_count = _load_rows(conn, table_name, list(schema.items()), chain(first_rows, rows))
+    return schema, row_count, sample_data
+
+def convert_csv_to_sqlite(csv_content: bytes, table_name: str, infer_types: bool = True) -> Dict[str, Any]:
     """
     Convert CSV file content to SQLite table
+
+    With infer_types=False, trusted CSV content is streamed straight into an
+    all-TEXT table by the csv module, skipping pandas parsing and type inference.
     """
     try:
         # Sanitize table name
         table_name = sanitize_table_name(table_name)
         
-        # Read CSV into pandas DataFrame
-        df = pd.read_csv(io.BytesIO(csv_content))
-        
-        # Clean column names
-        df.columns = [col.lower().replace(' ', '_').replace('-', '_') for col in df.columns]
-        
-        # Connect to SQLite database
-        conn = sqlite3.connect("db/database.db")
-        
-        # Write DataFrame to SQLite
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
-        
-        # Get schema information using safe query execution
-        cursor_info = execute_query_safely(
-            conn,
-            "PRAGMA table_info({table})",
-            identifier_params={'table': table_name}
-        )
-        columns_info = cursor_info.fetchall()
-        
-        schema = {}
-        for col in columns_info:
-            schema[col[1]] = col[2]  # column_name: data_type
-        
-        # Get sample data using safe query execution
-        cursor_sample = execute_query_safely(
-            conn,
-            "SELECT * FROM {table} LIMIT 5",
-            identifier_params={'table': table_name}
-        )
-        sample_rows = cursor_sample.fetchall()
-        column_names = [col[1] for col in columns_info]
-        sample_data = [dict(zip(column_names, row)) for row in sample_rows]
+        if not infer_types:
+            with ingest_connection() as conn:
+                schema, row_count, sample_data = _load_csv_rows(conn, csv_content, table_name)
+                return _summarize(table_name, schema, row_count, sample_data)
         
-        # Get row count using safe query execution
-        cursor_count = execute_query_safely(
-            conn,
-            "SELECT COUNT(*) FROM {table}",
-            identifier_params={'table': table_name}
-        )
-        row_count = cursor_count.fetchone()[0]
+        # Large files are read a chunk at a time, so column types are first
+        # settled over every chunk rather than guessed from the first one, and
+        # columns that widen to text are then read as text in every chunk
+        schema = None
+        text_columns = None
+        if len(csv_content) > CSV_CHUNK_THRESHOLD:
+            schema, text_columns = _widened_schema(_read_csv_chunks(csv_content))
         
-        conn.close()
+        # Read CSV into pandas DataFrames (one, or a chunk at a time for large files)
+        chunks = _read_csv_chunks(csv_content, text_columns)
         
-        return {
-            'table_name': table_name,
-            'schema': schema,
-            'row_count': row_count,
-            'sample_data': sample_data
-        }
+        # Write DataFrames to SQLite over the shared ingest connection
+        with ingest_connection() as conn:
+            first_chunk, row_count = _write_frames(conn, chunks, table_name, schema)
+            if schema is None:
+                schema = _frame_schema(first_chunk)
+
+            # Get schema, row count and sample data
+            return _summarize(table_name, schema, row_count, _sample_rows(conn, table_name))
         
     except Exception as e:
         raise Exception(f"Error converting CSV to SQLite: {str(e)}")
@@ -111,7 +394,7 @@ def convert_json_to_sqlite(json_content: bytes, table_name: str) -> Dict[str, An
         table_name = sanitize_table_name(table_name)
         
         # Parse JSON
-        data = json.loads(json_content.decode('utf-8'))
+        data = _json_loads(json_content)
         
         # Ensure it's a list of objects
         if not isinstance(data, list):
@@ -124,66 +407,30 @@ def convert_json_to_sqlite(json_content: bytes, table_name: str) -> Dict[str, An
         df = pd.DataFrame(data)
         
         # Clean column names
-        df.columns = [col.lower().replace(' ', '_').replace('-', '_') for col in df.columns]
-        
-        # Connect to SQLite database
-        conn = sqlite3.connect("db/database.db")
-        
-        # Write DataFrame to SQLite
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
-        
-        # Get schema information using safe query execution
-        cursor_info = execute_query_safely(
-            conn,
-            "PRAGMA table_info({table})",
-            identifier_params={'table': table_name}
-        )
-        columns_info = cursor_info.fetchall()
+        _clean_columns(df)
         
-        schema = {}
-        for col in columns_info:
-            schema[col[1]] = col[2]  # column_name: data_type
-        
-        # Get sample data using safe query execution
-        cursor_sample = execute_query_safely(
-            conn,
-            "SELECT * FROM {table} LIMIT 5",
-            identifier_params={'table': table_name}
-        )
-        sample_rows = cursor_sample.fetchall()
-        column_names = [col[1] for col in columns_info]
-        sample_data = [dict(zip(column_names, row)) for row in sample_rows]
-        
-        # Get row count using safe query execution
-        cursor_count = execute_query_safely(
-            conn,
-            "SELECT COUNT(*) FROM {table}",
-            identifier_params={'table': table_name}
-        )
-        row_count = cursor_count.fetchone()[0]
-        
-        conn.close()
-        
-        return {
-            'table_name': table_name,
-            'schema': schema,
-            'row_count': row_count,
-            'sample_data': sample_data
-        }
+        # Write DataFrame to SQLite over the shared ingest connection
+        with ingest_connection() as conn:
+            _write_dataframe(conn, df, table_name)
+
+            # Get schema, row count and sample data
+            return _summarize(table_name, _frame_schema(df), len(df), _sample_rows(conn, table_name))
         
     except Exception as e:
         raise Exception(f"Error converting JSON to SQLite: {str(e)}")
 
 def flatten_json_object(obj: Any, parent_key: str = '', delimiter: str = NESTED_FIELD_DELIMITER) -> Dict[str, str]:
     """
-    Recursively flatten a nested JSON object into a flat dictionary.
+    Flatten a nested JSON object into a flat dictionary.
 
     This function handles nested dictionaries by concatenating keys with a delimiter,
-    and handles arrays by enumerating items with an index suffix.
+    and handles arrays by enumerating items with an index suffix. Nesting is walked
+    with an explicit stack rather than recursion, so every value is written into a
+    single output dictionary.
 
     Args:
         obj: The JSON object to flatten (dict, list, or primitive value)
-        parent_key: The parent key path (used in recursion)
+        parent_key: The key path prefix for all flattened keys
         delimiter: The delimiter to use for concatenating nested keys (default: NESTED_FIELD_DELIMITER)
 
     Returns:
@@ -200,30 +447,80 @@ def flatten_json_object(obj: Any, parent_key: str = '', delimiter: str = NESTED_
         {"data__items_0__id": "1", "data__items_1__id": "2"}
     """
     items = {}
+    index_delimiter = LIST_INDEX_DELIMITER
+    stack = [(obj, parent_key)]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        current, key = pop()
+
+        if isinstance(current, dict):
+            # Handle nested dictionaries; push in reverse so keys keep document order.
+            # Keys are interned so every record shares one string per column name.
+            prefix = key + delimiter if key else ''
+            for child_key, value in reversed(current.items()):
+                push((value, intern(prefix + child_key)))
+
+        elif isinstance(current, list):
+            # Handle arrays by indexing each item
+            prefix = key + index_delimiter
+            for i in range(len(current) - 1, -1, -1):
+                push((current[i], intern(prefix + str(i))))
 
-    if isinstance(obj, dict):
-        # Handle nested dictionaries
-        for key, value in obj.items():
-            new_key = f"{parent_key}{delimiter}{key}" if parent_key else key
-            items.update(flatten_json_object(value, new_key, delimiter))
-
-    elif isinstance(obj, list):
-        # Handle arrays by indexing each item
-        for i, item in enumerate(obj):
-            new_key = f"{parent_key}{LIST_INDEX_DELIMITER}{i}"
-            items.update(flatten_json_object(item, new_key, delimiter))
-
-    else:
-        # Handle primitive types (strings, numbers, booleans, null)
-        # Convert everything to string for consistent storage
-        if obj is None:
-            items[parent_key] = None
         else:
-            items[parent_key] = str(obj)
+            # Handle primitive types (strings, numbers, booleans, null)
+            # Convert everything to string for consistent storage
+            items[key] = None if current is None else str(current)
 
     return items
 
-def discover_jsonl_schema(jsonl_content: bytes) -> Set[str]:
+try:
+    # Use the compiled flattener when it has been built (see core/_flatten.pyx)
+    from ._flatten import flatten_json_object  # noqa: F811
+except ImportError:  # pragma: no cover - the Cython build is optional
+    pass
+
+def _iter_jsonl_records(
+    jsonl_content: Union[bytes, Iterable[bytes]],
+    strict_first: bool = False,
+    loads: Callable[[bytes], Any] = _json_loads
+) -> Iterator[Tuple[bytes, Any]]:
+    """
+    Yield (line, parsed object) for every non-empty line of JSONL content.
+
+    Lines are streamed from the bytes without materializing a list of lines
+    (the parser accepts bytes, so they are never decoded); content that is
+    already split into lines is iterated as is. Malformed lines are skipped
+    with a warning, except that with strict_first a malformed first record
+    raises ValueError before the rest of the file is read. loads is the
+    decoder; it must accept bytes and raise ValueError on malformed input.
+    """
+    lines = io.BytesIO(jsonl_content) if isinstance(jsonl_content, bytes) else jsonl_content
+    first = True
+    for line_num, line in enumerate(lines, 1):
+        line = line.strip()
+
+        # Skip empty lines
+        if not line:
+            continue
+
+        try:
+            obj = loads(line)
+        except ValueError as e:
+            if first and strict_first:
+                raise ValueError(f"Line {line_num} is not valid JSON: {e}")
+            # Skip malformed lines gracefully
+            print(f"Warning: Skipping malformed JSON on line {line_num}: {e}")
+            continue
+
+        first = False
+        yield line, obj
+
+def discover_jsonl_schema(
+    jsonl_content: Union[bytes, Iterable[bytes]],
+    loads: Callable[[bytes], Any] = _json_loads
+) -> Set[str]:
     """
     Discover all unique field names across all records in a JSONL file.
 
@@ -232,7 +529,8 @@ def discover_jsonl_schema(jsonl_content: bytes) -> Set[str]:
     accommodates all fields found in any record.
 
     Args:
-        jsonl_content: The JSONL file content as bytes
+        jsonl_content: The JSONL file content as bytes, or its lines already split
+        loads: JSON decoder for each line (orjson, with a stdlib json fallback, by default)
 
     Returns:
         A set of all discovered field names (flattened) across all records
@@ -248,41 +546,116 @@ def discover_jsonl_schema(jsonl_content: bytes) -> Set[str]:
         Malformed JSON lines are skipped gracefully with a warning,
         allowing the function to continue processing valid records.
     """
+    return discover_record_schema(obj for _, obj in _iter_jsonl_records(jsonl_content, loads=loads))
+
+def discover_record_schema(records: Iterable[Any]) -> Set[str]:
+    """
+    Discover all unique flattened field names across already-decoded records.
+
+    This is the schema pass of discover_jsonl_schema without the line
+    splitting and JSON decoding, for callers that hold parsed records.
+
+    Args:
+        records: Decoded JSON records (typically dicts)
+
+    Returns:
+        A set of all discovered field names (flattened) across all records
+    """
     all_fields = set()
 
-    # Read JSONL file line by line
-    content_str = jsonl_content.decode('utf-8')
-    lines = content_str.strip().split('\n')
+    for obj in records:
+        # Flatten the object and collect field names
+        all_fields.update(flatten_json_object(obj).keys())
 
-    for line_num, line in enumerate(lines, 1):
-        line = line.strip()
+    return all_fields
 
-        # Skip empty lines
-        if not line:
-            continue
+def _read_jsonl_flattened(jsonl_content: bytes) -> pd.DataFrame:
+    """
+    Parse and fully flatten every JSONL record into one DataFrame.
+    """
+    # Parse and flatten every record in a single pass
+    flattened_records = [
+        flatten_json_object(obj) for _, obj in _iter_jsonl_records(jsonl_content, strict_first=True)
+    ]
 
-        try:
-            # Parse JSON object
-            obj = json.loads(line)
+    # Union every record's keys in one C-level call
+    all_fields = set().union(*flattened_records)
 
-            # Flatten the object and collect field names
-            flattened = flatten_json_object(obj)
-            all_fields.update(flattened.keys())
+    if not all_fields:
+        raise ValueError("JSONL file is empty or contains no valid records")
 
-        except json.JSONDecodeError as e:
-            # Skip malformed lines gracefully
-            print(f"Warning: Skipping malformed JSON on line {line_num}: {e}")
-            continue
+    # Fields missing from a record become NaN
+    return pd.DataFrame.from_records(flattened_records, columns=sorted(all_fields))
 
-    return all_fields
+def _extract_paths(obj: Any, paths: Set[str], prefixes: Set[str]) -> Dict[str, Optional[str]]:
+    """
+    Return the entries of flatten_json_object(obj) whose keys are in paths.
 
-def convert_jsonl_to_sqlite(jsonl_content: bytes, table_name: str) -> Dict[str, Any]:
+    Keys are joined exactly as flatten_json_object does, so a key that itself
+    contains the delimiter (e.g. "a__b") matches its flattened name. Nesting
+    is only walked while the key built so far is in prefixes, the set of
+    every leading substring of the requested paths.
+    """
+    found = {}
+    delimiter = NESTED_FIELD_DELIMITER
+    index_delimiter = LIST_INDEX_DELIMITER
+    stack = [(obj, '')]
+    pop = stack.pop
+    push = stack.append
+
+    while stack:
+        current, key = pop()
+
+        if isinstance(current, dict):
+            # Push in reverse so keys keep document order, as flatten_json_object does
+            prefix = key + delimiter if key else ''
+            for child_key, value in reversed(current.items()):
+                child = prefix + child_key
+                if child in prefixes:
+                    push((value, child))
+
+        elif isinstance(current, list):
+            prefix = key + index_delimiter
+            for i in range(len(current) - 1, -1, -1):
+                child = prefix + str(i)
+                if child in prefixes:
+                    push((current[i], child))
+
+        elif key in paths:
+            found[key] = None if current is None else str(current)
+
+    return found
+
+def _read_jsonl_paths(jsonl_content: bytes, flatten_paths: Set[str]) -> pd.DataFrame:
+    """
+    Build a DataFrame holding each raw JSONL record plus only the requested flattened paths.
+
+    The original record is kept as JSON text in RAW_JSON_COLUMN, so any other
+    field can still be queried with SQLite's json_extract().
+    """
+    paths = sorted(flatten_paths)
+    if RAW_JSON_COLUMN in paths:
+        raise ValueError(f"'{RAW_JSON_COLUMN}' is reserved for the raw record column")
+    wanted = set(paths)
+    prefixes = {path[:end] for path in paths for end in range(1, len(path) + 1)}
+
+    rows = []
+    for line, obj in _iter_jsonl_records(jsonl_content, strict_first=True):
+        found = _extract_paths(obj, wanted, prefixes)
+        rows.append([found.get(path) for path in paths] + [line.decode('utf-8')])
+
+    if not rows:
+        raise ValueError("JSONL file is empty or contains no valid records")
+
+    return pd.DataFrame(rows, columns=paths + [RAW_JSON_COLUMN])
+
+def convert_jsonl_to_sqlite(jsonl_content: bytes, table_name: str, flatten_paths: Optional[Set[str]] = None) -> Dict[str, Any]:
     """
     Convert JSONL (JSON Lines) file content to SQLite table.
 
     JSONL files contain one JSON object per line, making them ideal for streaming
     large datasets. This function:
-    1. Discovers all fields across all records (schema discovery)
+    1. Parses each record and discovers all fields in a single pass
     2. Flattens nested objects and arrays
     3. Creates a unified schema
     4. Converts to pandas DataFrame
@@ -291,6 +664,10 @@ def convert_jsonl_to_sqlite(jsonl_content: bytes, table_name: str) -> Dict[str,
     Args:
         jsonl_content: The JSONL file content as bytes
         table_name: The desired table name (will be sanitized)
+        flatten_paths: Optional set of flattened field names (e.g. "user__name") to
+            extract as columns. When given, no schema discovery or full flattening
+            happens: the table holds only these columns plus the original record
+            as JSON text in a raw_json column, queryable with json_extract().
 
     Returns:
         A dictionary containing:
@@ -300,7 +677,9 @@ def convert_jsonl_to_sqlite(jsonl_content: bytes, table_name: str) -> Dict[str,
         - sample_data: List of first 5 rows as dictionaries
 
     Raises:
-        Exception: If the JSONL file is empty, malformed, or database operations fail
+        Exception: If the JSONL file is empty, malformed, or database operations fail.
+            Malformed lines after the first record are skipped with a warning, but a
+            malformed first record fails the upload before the rest is parsed.
 
     Example JSONL input:
         {"id": 1, "user": {"name": "Alice"}, "tags": ["python", "data"]}
@@ -313,87 +692,100 @@ def convert_jsonl_to_sqlite(jsonl_content: bytes, table_name: str) -> Dict[str,
         # Sanitize table name
         table_name = sanitize_table_name(table_name)
 
-        # Step 1: Discover schema across all records
-        all_fields = discover_jsonl_schema(jsonl_content)
-
-        if not all_fields:
-            raise ValueError("JSONL file is empty or contains no valid records")
-
-        # Step 2: Read and flatten all records
-        content_str = jsonl_content.decode('utf-8')
-        lines = content_str.strip().split('\n')
+        # Reject empty uploads without scanning (isspace() stops at the first non-space byte)
+        if not jsonl_content or jsonl_content.isspace():
+            raise ValueError("JSONL file is empty")
 
-        flattened_records = []
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            try:
-                obj = json.loads(line)
-                flattened = flatten_json_object(obj)
+        # Steps 1-3: Parse, flatten and build a DataFrame in a single pass
+        if flatten_paths is None:
+            df = _read_jsonl_flattened(jsonl_content)
+        else:
+            df = _read_jsonl_paths(jsonl_content, flatten_paths)
 
-                # Ensure all fields are present (fill missing with None)
-                complete_record = {field: flattened.get(field) for field in all_fields}
-                flattened_records.append(complete_record)
+        # Clean column names (lowercase, replace special chars)
+        _clean_columns(df)
 
-            except json.JSONDecodeError:
-                # Skip malformed lines (already warned in schema discovery)
-                continue
+        # Step 4: Write DataFrame to SQLite over the shared ingest connection
+        with ingest_connection() as conn:
+            _write_dataframe(conn, df, table_name)
 
-        if not flattened_records:
-            raise ValueError("No valid records found in JSONL file")
+            # Get schema, row count and sample data
+            return _summarize(table_name, _frame_schema(df), len(df), _sample_rows(conn, table_name))
 
-        # Step 3: Create pandas DataFrame
-        df = pd.DataFrame(flattened_records)
+    except Exception as e:
+        raise Exception(f"Error converting JSONL to SQLite: {str(e)}")
 
-        # Clean column names (lowercase, replace special chars)
-        df.columns = [col.lower().replace(' ', '_').replace('-', '_') for col in df.columns]
+# Upload conversions run in worker processes so JSON parsing and flattening use all
+# cores instead of blocking the event loop; each worker keeps its own ingest connection.
+# Spawned workers re-import the parent's main script (server.py) as __mp_main__, so
+# that module must stay free of import-time side effects beyond building the app.
+CONVERTER_WORKERS = min(4, os.cpu_count() or 1)
 
-        # Step 4: Connect to SQLite database
-        conn = sqlite3.connect("db/database.db")
+_converter_pool: Optional[ProcessPoolExecutor] = None
 
-        # Write DataFrame to SQLite
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+def _init_converter_worker(database_path: str) -> None:
+    """
+    Point a converter worker's ingest connection at the parent's database
+    """
+    db.DATABASE_PATH = database_path
 
-        # Step 5: Get schema information using safe query execution
-        cursor_info = execute_query_safely(
-            conn,
-            "PRAGMA table_info({table})",
-            identifier_params={'table': table_name}
+def _get_converter_pool() -> ProcessPoolExecutor:
+    """
+    Return the shared converter process pool, creating it on first use
+    """
+    global _converter_pool
+    if _converter_pool is None:
+        # Spawn rather than fork so workers never inherit the parent's SQLite connection
+        _converter_pool = ProcessPoolExecutor(
+            max_workers=CONVERTER_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_converter_worker,
+            initargs=(db.DATABASE_PATH,)
         )
-        columns_info = cursor_info.fetchall()
+    return _converter_pool
+
+async def convert_in_worker(
+    converter: Callable[..., Dict[str, Any]],
+    content: bytes,
+    table_name: str,
+    **options: Any
+) -> Dict[str, Any]:
+    """
+    Run one of the convert_*_to_sqlite functions in the converter process pool.
 
-        schema = {}
-        for col in columns_info:
-            schema[col[1]] = col[2]  # column_name: data_type
+    Keyword options (e.g. flatten_paths) are passed on to the converter.
 
-        # Get sample data using safe query execution
-        cursor_sample = execute_query_safely(
-            conn,
-            "SELECT * FROM {table} LIMIT 5",
-            identifier_params={'table': table_name}
-        )
-        sample_rows = cursor_sample.fetchall()
-        column_names = [col[1] for col in columns_info]
-        sample_data = [dict(zip(column_names, row)) for row in sample_rows]
-
-        # Get row count using safe query execution
-        cursor_count = execute_query_safely(
-            conn,
-            "SELECT COUNT(*) FROM {table}",
-            identifier_params={'table': table_name}
-        )
-        row_count = cursor_count.fetchone()[0]
+    Concurrent uploads are parsed in parallel; their writes are serialized by
+    SQLite (WAL + BEGIN IMMEDIATE with a busy timeout). If a worker dies (e.g.
+    killed for running out of memory) the pool is broken: this upload fails
+    with BrokenProcessPool and the pool is replaced for the next one.
 
-        conn.close()
+    Example:
+        result = await convert_in_worker(convert_csv_to_sqlite, content, "users")
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_converter_pool()
+    try:
+        return await loop.run_in_executor(pool, partial(converter, content, table_name, **options))
+    except BrokenProcessPool:
+        _discard_converter_pool(pool)
+        raise
 
-        return {
-            'table_name': table_name,
-            'schema': schema,
-            'row_count': row_count,
-            'sample_data': sample_data
-        }
+def _discard_converter_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Drop a broken pool so the next conversion starts a new one
+    """
+    global _converter_pool
+    # Concurrent uploads on the same broken pool must not discard its replacement
+    if _converter_pool is pool:
+        _converter_pool = None
+    pool.shutdown(wait=False)
 
-    except Exception as e:
-        raise Exception(f"Error converting JSONL to SQLite: {str(e)}")
\ No newline at end of file
+def shutdown_converter_pool() -> None:
+    """
+    Stop the converter worker processes, if they were started
+    """
+    global _converter_pool
+    if _converter_pool is not None:
+        _converter_pool.shutdown()
+        _converter_pool = None
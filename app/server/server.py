@@ -1,5 +1,6 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from datetime import datetime
 import os
 import sqlite3
@@ -37,7 +38,13 @@ from core.data_models import (
 )
 
 # Import core modules (to be implemented)
-from core.file_processor import convert_csv_to_sqlite, convert_json_to_sqlite, convert_jsonl_to_sqlite
+from core.file_processor import (
+    convert_csv_to_sqlite,
+    convert_json_to_sqlite,
+    convert_jsonl_to_sqlite,
+    convert_in_worker,
+    shutdown_converter_pool
+)
 from core.llm_processor import generate_sql
 from core.sql_processor import execute_sql_safely, get_database_schema
 from core.insights import generate_insights
@@ -48,10 +55,17 @@ from core.sql_security import (
     SQLSecurityError
 )
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Stop the upload converter worker processes when the app shuts down"""
+    yield
+    shutdown_converter_pool()
+
 app = FastAPI(
     title="Natural Language SQL Interface",
     description="Convert natural language to SQL queries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS configuration for frontend
@@ -70,8 +84,20 @@ app_start_time = datetime.now()
 os.makedirs("db", exist_ok=True)
 
 @app.post("/api/upload", response_model=FileUploadResponse)
-async def upload_file(file: UploadFile = File(...)) -> FileUploadResponse:
-    """Upload and convert .csv, .json, or .jsonl file to SQLite table"""
+async def upload_file(
+    file: UploadFile = File(...),
+    infer_types: bool = True,
+    flatten_paths: Optional[str] = None
+) -> FileUploadResponse:
+    """
+    Upload and convert .csv, .json, or .jsonl file to SQLite table
+
+    For .csv files, infer_types=false stores every column as text exactly as
+    written, skipping pandas parsing (faster for large trusted files).
+    For .jsonl files, flatten_paths is an optional comma-separated list of
+    flattened field names (e.g. "level,user__name") to extract as columns;
+    the rest of each record is kept in a raw_json column.
+    """
     try:
         # Validate file type
         if not file.filename.endswith(('.csv', '.json', '.jsonl')):
@@ -84,13 +110,16 @@ async def upload_file(file: UploadFile = File(...)) -> FileUploadResponse:
         content = await file.read()
 
         # Convert to SQLite based on file type
+        # (in a worker process, so parsing does not block the event loop)
         if file.filename.endswith('.csv'):
-            result = convert_csv_to_sqlite(content, table_name)
+            result = await convert_in_worker(convert_csv_to_sqlite, content, table_name, infer_types=infer_types)
         elif file.filename.endswith('.jsonl'):
-            result = convert_jsonl_to_sqlite(content, table_name)
+            # Only the requested paths are flattened into columns, if any are given
+            paths = {path.strip() for path in (flatten_paths or '').split(',') if path.strip()}
+            result = await convert_in_worker(convert_jsonl_to_sqlite, content, table_name, flatten_paths=paths or None)
             logger.info(f"[INFO] JSONL file uploaded: {file.filename}, table: {result['table_name']}")
         else:
-            result = convert_json_to_sqlite(content, table_name)
+            result = await convert_in_worker(convert_json_to_sqlite, content, table_name)
 
         response = FileUploadResponse(
             table_name=result['table_name'],
@@ -1,427 +1,529 @@
 import pytest
 import json
+import os
+import orjson
 import pandas as pd
 import sqlite3
-import os
-import io
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from types import MappingProxyType
 from unittest.mock import patch
+from pandas.testing import assert_frame_equal
 from core.file_processor import (
     convert_csv_to_sqlite,
     convert_json_to_sqlite,
     convert_jsonl_to_sqlite,
     flatten_json_object,
-    discover_jsonl_schema
+    discover_jsonl_schema,
+    discover_record_schema,
+    convert_in_worker,
+    shutdown_converter_pool
 )
-from core.constants import NESTED_FIELD_DELIMITER, LIST_INDEX_DELIMITER
-
-
-@pytest.fixture
-def test_db():
-    """Create an in-memory test database"""
-    # Create in-memory database
-    conn = sqlite3.connect(':memory:')
+from core import db
+from core.db import close_ingest_conn
+
+# Named shared-cache in-memory database for this module; each xdist worker gets its own
+TEST_DB_URI = "file:file_processor_tests?mode=memory&cache=shared"
+
+# Directory holding the test asset files
+ASSETS_DIR = (Path(__file__).parent.parent / "assets").resolve()
+
+# Contents of every asset file, read once at import; read-only so tests cannot alter them
+ASSETS = MappingProxyType({path.name: path.read_bytes() for path in ASSETS_DIR.iterdir() if path.is_file()})
+
+# CSV with inconsistent row lengths
+INVALID_CSV_BYTES = ASSETS["invalid.csv"]
+
+# JSON decoders schema discovery must agree across
+DECODERS = [pytest.param(json.loads, id="json"), pytest.param(orjson.loads, id="orjson")]
+try:
+    import ujson
+    DECODERS.append(pytest.param(ujson.loads, id="ujson"))
+except ImportError:
+    pass
+
+# Sample JSONL for the schema discovery tests, split into lines and decoded once at import
+SAMPLE_JSONL_BYTES = b'''{"id": 1, "name": "Alice"}
+{"id": 2, "user": {"name": "Bob", "email": "bob@example.com"}}
+
+{"id": 3, "tags": ["python", "data"]}'''
+SAMPLE_JSONL_LINES = tuple(line for line in SAMPLE_JSONL_BYTES.split(b'\n') if line.strip())
+SAMPLE_RECORDS = [orjson.loads(line) for line in SAMPLE_JSONL_LINES]
+SAMPLE_FIELDS = {"id", "name", "user__name", "user__email", "tags_0", "tags_1"}
+
+# Expected outputs, built once at import
+EXPECTED_MIXED = {
+    "data__items_0__id": "1",
+    "data__items_0__name": "first",
+    "data__items_1__id": "2",
+    "data__items_1__name": "second"
+}
+EXPECTED_USERS = pd.DataFrame([
+    {'name': 'John Doe', 'age': 25, 'city': 'New York', 'email': 'john@example.com'},
+    {'name': 'Jane Smith', 'age': 30, 'city': 'Los Angeles', 'email': 'jane@example.com'},
+]).set_index('name')
+EXPECTED_RAW_USERS = pd.DataFrame([
+    {'name': 'John Doe', 'age': '25'},
+    {'name': 'Jane Smith', 'age': '30'},
+]).set_index('name')
+EXPECTED_PRODUCTS = pd.DataFrame([
+    # Booleans are stored, and so sampled, as 1/0
+    {'name': 'Laptop', 'price': 999.99, 'category': 'Electronics', 'in_stock': 1},
+    {'name': 'Coffee Mug', 'price': 12.50, 'category': 'Kitchen', 'in_stock': 0},
+]).set_index('name')
+
+# Synthetic payloads for the flatten_json_object benchmarks, built once at import:
+# five leaves per record, so these hold 100 and 1000 values
+def _make_payload(leaf_count):
+    return {
+        "records": [
+            {"id": i, "user": {"name": f"user{i}", "active": i % 2 == 0}, "tags": ["a", None]}
+            for i in range(leaf_count // 5)
+        ]
+    }
+
+PAYLOAD_100 = _make_payload(100)
+PAYLOAD_1000 = _make_payload(1000)
+
+try:
+    import pytest_benchmark  # noqa: F401
+    HAS_BENCHMARK = True
+except ImportError:
+    HAS_BENCHMARK = False
+
+# Keep this module on one xdist worker so its module-scoped database is set up once
+pytestmark = pytest.mark.xdist_group("file_processor")
+
+
+@pytest.fixture(scope="module")
+def module_db():
+    """Create one in-memory test database shared by the tests in this module"""
+    # Create a shared-cache in-memory database, so other connections and threads
+    # in this worker can open the same schema by URI
+    conn = sqlite3.connect(TEST_DB_URI, uri=True, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=MEMORY")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA temp_store=MEMORY")
     
-    # Patch the database connection to use our in-memory database
-    with patch('core.file_processor.sqlite3.connect') as mock_connect:
-        mock_connect.return_value = conn
-        yield conn
+    # Hand the converters our in-memory database as their ingest connection for
+    # the whole module (other sqlite3.connect callers are left alone), dropping
+    # any shared ingest connection opened elsewhere
+    close_ingest_conn()
+    connect_patch = patch.object(db, 'open_ingest_conn', return_value=conn)
+    connect_patch.start()
     
-    conn.close()
+    yield conn
+    
+    connect_patch.stop()
+    close_ingest_conn()
 
 
 @pytest.fixture
+def test_db(module_db):
+    """Hand the test the module database and drop every table it created afterwards"""
+    yield module_db
+    tables = [name for (name,) in module_db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    for name in tables:
+        module_db.execute(f'DROP TABLE "{name}"')
+    module_db.commit()
+
+
+@pytest.fixture(scope="session")
 def test_assets_dir():
     """Get the path to test assets directory"""
-    return Path(__file__).parent.parent / "assets"
+    return ASSETS_DIR
+
+
+@pytest.fixture(scope="session")
+def asset_bytes():
+    """Return a loader mapping an asset filename to its contents"""
+    return ASSETS.__getitem__
+
+
+@pytest.fixture
+def jsonl_lines():
+    """Get the sample JSONL content already split into non-empty lines"""
+    return SAMPLE_JSONL_LINES
 
 
 class TestFileProcessor:
     
-    def test_convert_csv_to_sqlite_success(self, test_db, test_assets_dir):
+    def test_convert_csv_to_sqlite_success(self, test_db, asset_bytes):
         # Load real CSV file
-        csv_file = test_assets_dir / "test_users.csv"
-        with open(csv_file, 'rb') as f:
-            csv_data = f.read()
-        
         table_name = "users"
-        result = convert_csv_to_sqlite(csv_data, table_name)
+        result = convert_csv_to_sqlite(asset_bytes("test_users.csv"), table_name)
         
         # Verify return structure
         assert result['table_name'] == table_name
-        assert 'schema' in result
-        assert 'row_count' in result
-        assert 'sample_data' in result
+        assert {'schema', 'row_count', 'sample_data'} <= result.keys()
         
         # Test the returned data
         assert result['row_count'] == 4  # 4 users in test file
         assert len(result['sample_data']) <= 5  # Should return up to 5 samples
         
         # Verify schema has expected columns (cleaned names)
-        assert 'name' in result['schema']
-        assert 'age' in result['schema'] 
-        assert 'city' in result['schema']
-        assert 'email' in result['schema']
+        assert {'name', 'age', 'city', 'email'} <= result['schema'].keys()
         
         # Verify sample data structure and content
-        john_data = next((item for item in result['sample_data'] if item['name'] == 'John Doe'), None)
-        assert john_data is not None
-        assert john_data['age'] == 25
-        assert john_data['city'] == 'New York'
-        assert john_data['email'] == 'john@example.com'
+        actual = pd.DataFrame(result['sample_data']).set_index('name')
+        assert_frame_equal(actual.loc[EXPECTED_USERS.index, EXPECTED_USERS.columns], EXPECTED_USERS, check_like=True)
     
-    def test_convert_csv_to_sqlite_column_cleaning(self, test_db, test_assets_dir):
+    def test_convert_csv_to_sqlite_column_cleaning(self, test_db, asset_bytes):
         # Test column name cleaning with real file
-        csv_file = test_assets_dir / "column_names.csv"
-        with open(csv_file, 'rb') as f:
-            csv_data = f.read()
-        
         table_name = "test_users"
-        result = convert_csv_to_sqlite(csv_data, table_name)
+        result = convert_csv_to_sqlite(asset_bytes("column_names.csv"), table_name)
         
         # Verify columns were cleaned in the schema
-        assert 'full_name' in result['schema']
-        assert 'birth_date' in result['schema']
-        assert 'email_address' in result['schema']
-        assert 'phone_number' in result['schema']
+        assert {'full_name', 'birth_date', 'email_address', 'phone_number'} <= result['schema'].keys()
         
         # Verify sample data has cleaned column names and actual content
         sample = result['sample_data'][0]
-        assert 'full_name' in sample
-        assert 'birth_date' in sample
-        assert 'email_address' in sample
+        assert {'full_name', 'birth_date', 'email_address'} <= sample.keys()
         assert sample['full_name'] == 'John Doe'
         assert sample['birth_date'] == '1990-01-15'
     
-    def test_convert_csv_to_sqlite_with_inconsistent_data(self, test_db, test_assets_dir):
-        # Test with CSV that has inconsistent row lengths - should raise error
-        csv_file = test_assets_dir / "invalid.csv"
-        with open(csv_file, 'rb') as f:
-            csv_data = f.read()
-        
-        table_name = "inconsistent_table"
-        
-        # Pandas will fail on inconsistent CSV data
-        with pytest.raises(Exception) as exc_info:
-            convert_csv_to_sqlite(csv_data, table_name)
-        
-        assert "Error converting CSV to SQLite" in str(exc_info.value)
-    
-    def test_convert_json_to_sqlite_success(self, test_db, test_assets_dir):
+    def test_convert_csv_to_sqlite_chunked(self, test_db):
+        # Force the chunked read path with a tiny threshold and chunk size
+        csv_data = b"id,name\n" + b"".join(f"{i},user{i}\n".encode() for i in range(7))
+
+        table_name = "chunked_users"
+        with patch('core.file_processor.CSV_CHUNK_THRESHOLD', 0), \
+                patch('core.file_processor.CSV_CHUNK_SIZE', 3):
+            result = convert_csv_to_sqlite(csv_data, table_name)
+
+        assert result['row_count'] == 7
+        assert result['schema'] == {'id': 'INTEGER', 'name': 'TEXT'}
+        assert test_db.execute("SELECT COUNT(*) FROM chunked_users").fetchone()[0] == 7
+
+    def test_convert_csv_to_sqlite_chunked_widens_types(self, test_db):
+        # Just over the threshold, later chunks widen the types the first chunk suggests
+        csv_data = b"code,score\n1,10\n2,20\n007,2.5\nabc,30\n"
+
+        with patch('core.file_processor.CSV_CHUNK_THRESHOLD', len(csv_data) - 1), \
+                patch('core.file_processor.CSV_CHUNK_SIZE', 2):
+            chunked = convert_csv_to_sqlite(csv_data, "chunked_codes")
+        whole = convert_csv_to_sqlite(csv_data, "whole_codes")
+
+        assert chunked['schema'] == whole['schema'] == {'code': 'TEXT', 'score': 'REAL'}
+        assert chunked['sample_data'] == whole['sample_data']
+        stored = test_db.execute("SELECT code, score FROM chunked_codes").fetchall()
+        assert stored == test_db.execute("SELECT code, score FROM whole_codes").fetchall()
+        assert stored == [('1', 10.0), ('2', 20.0), ('007', 2.5), ('abc', 30.0)]
+
+    @pytest.mark.parametrize("csv_data", [
+        # A chunk holds only numeric-looking or boolean-looking values of a text column
+        b"code,flag\n1,True\n2,False\n007,True\n008,False\nabc,x\n",
+        # Booleans with missing cells, and a column that is empty in a whole chunk
+        b"flag,score\nTrue,1\nFalse,2\n,\n,\n",
+    ])
+    def test_convert_csv_to_sqlite_chunked_matches_whole_file(self, test_db, csv_data):
+        with patch('core.file_processor.CSV_CHUNK_THRESHOLD', 0), \
+                patch('core.file_processor.CSV_CHUNK_SIZE', 2):
+            chunked = convert_csv_to_sqlite(csv_data, "chunked_rows")
+        whole = convert_csv_to_sqlite(csv_data, "whole_rows")
+
+        assert chunked['schema'] == whole['schema']
+        assert chunked['sample_data'] == whole['sample_data']
+        stored = test_db.execute("SELECT * FROM chunked_rows").fetchall()
+        assert stored == test_db.execute("SELECT * FROM whole_rows").fetchall()
+
+    def test_convert_csv_to_sqlite_keeps_date_text(self, test_db):
+        # Dates and timestamps are stored and sampled as the text in the file
+        csv_data = b"id,day,seen_at\n1,2024-01-15,2024-01-15T10:00:00\n2,,2024-01-16 11:30:00\n"
+
+        table_name = "visits"
+        result = convert_csv_to_sqlite(csv_data, table_name)
+
+        assert result['schema'] == {'id': 'INTEGER', 'day': 'TEXT', 'seen_at': 'TEXT'}
+        assert result['sample_data'] == [
+            {'id': 1, 'day': '2024-01-15', 'seen_at': '2024-01-15T10:00:00'},
+            {'id': 2, 'day': None, 'seen_at': '2024-01-16 11:30:00'},
+        ]
+
+    def test_convert_csv_to_sqlite_keeps_time_text(self, test_db):
+        # Times of day are stored and sampled as the text in the file
+        csv_data = b"id,opens_at\n1,09:30:00\n2,17:45:10\n"
+
+        result = convert_csv_to_sqlite(csv_data, "opening_hours")
+
+        assert result['schema'] == {'id': 'INTEGER', 'opens_at': 'TEXT'}
+        assert [row['opens_at'] for row in result['sample_data']] == ['09:30:00', '17:45:10']
+        stored = test_db.execute("SELECT opens_at FROM opening_hours ORDER BY id").fetchall()
+        assert stored == [('09:30:00',), ('17:45:10',)]
+
+    def test_convert_csv_to_sqlite_header_only(self, test_db):
+        # A CSV with a header and no rows creates an empty all-TEXT table
+        result = convert_csv_to_sqlite(b"name,age\n", "no_rows")
+
+        assert result['schema'] == {'name': 'TEXT', 'age': 'TEXT'}
+        assert result['row_count'] == 0
+        assert result['sample_data'] == []
+
+    def test_convert_csv_to_sqlite_without_type_inference(self, test_db, asset_bytes):
+        # Trusted CSVs can skip pandas; every value is stored as text
+        csv_data = asset_bytes("test_users.csv")
+
+        table_name = "raw_users"
+        result = convert_csv_to_sqlite(csv_data, table_name, infer_types=False)
+
+        assert result['row_count'] == 4
+        assert result['schema'] == {'name': 'TEXT', 'age': 'TEXT', 'city': 'TEXT', 'email': 'TEXT'}
+        actual = pd.DataFrame(result['sample_data']).set_index('name')
+        assert_frame_equal(actual.loc[EXPECTED_RAW_USERS.index, EXPECTED_RAW_USERS.columns], EXPECTED_RAW_USERS, check_like=True)
+
+    def test_convert_csv_to_sqlite_without_type_inference_blank_lines(self, test_db):
+        # Blank lines, including leading and trailing ones, are skipped rather than inserted
+        result = convert_csv_to_sqlite(b"\na,b\n1,2\n\n3,4\n\n", "blank_lines", infer_types=False)
+
+        assert result['row_count'] == 2
+        assert result['sample_data'] == [{'a': '1', 'b': '2'}, {'a': '3', 'b': '4'}]
+        assert test_db.execute("SELECT COUNT(*) FROM blank_lines").fetchone()[0] == 2
+
+    def test_convert_json_to_sqlite_success(self, test_db, asset_bytes):
         # Load real JSON file
-        json_file = test_assets_dir / "test_products.json"
-        with open(json_file, 'rb') as f:
-            json_data = f.read()
-        
         table_name = "products"
-        result = convert_json_to_sqlite(json_data, table_name)
+        result = convert_json_to_sqlite(asset_bytes("test_products.json"), table_name)
         
         # Verify return structure
         assert result['table_name'] == table_name
-        assert 'schema' in result
-        assert 'row_count' in result
-        assert 'sample_data' in result
+        assert {'schema', 'row_count', 'sample_data'} <= result.keys()
         
         # Test the returned data
         assert result['row_count'] == 3  # 3 products in test file
         assert len(result['sample_data']) == 3
         
         # Verify schema has expected columns
-        assert 'id' in result['schema']
-        assert 'name' in result['schema']
-        assert 'price' in result['schema']
-        assert 'category' in result['schema']
-        assert 'in_stock' in result['schema']
+        assert {'id', 'name', 'price', 'category', 'in_stock'} <= result['schema'].keys()
         
         # Verify sample data structure and content
-        laptop_data = next((item for item in result['sample_data'] if item['name'] == 'Laptop'), None)
-        assert laptop_data is not None
-        assert laptop_data['price'] == 999.99
-        assert laptop_data['category'] == 'Electronics'
-        assert laptop_data['in_stock'] == True
-    
-    def test_convert_json_to_sqlite_invalid_json(self):
-        # Test with invalid JSON
-        json_data = b'invalid json'
-        table_name = "test_table"
-        
-        with pytest.raises(Exception) as exc_info:
-            convert_json_to_sqlite(json_data, table_name)
-        
-        assert "Error converting JSON to SQLite" in str(exc_info.value)
-    
-    def test_convert_json_to_sqlite_not_array(self):
-        # Test with JSON that's not an array
-        json_data = b'{"name": "John", "age": 25}'
-        table_name = "test_table"
-        
-        with pytest.raises(Exception) as exc_info:
-            convert_json_to_sqlite(json_data, table_name)
-        
-        assert "JSON must be an array of objects" in str(exc_info.value)
+        actual = pd.DataFrame(result['sample_data']).set_index('name')
+        assert_frame_equal(actual.loc[EXPECTED_PRODUCTS.index, EXPECTED_PRODUCTS.columns], EXPECTED_PRODUCTS, check_like=True)
     
-    def test_convert_json_to_sqlite_empty_array(self):
-        # Test with empty JSON array
-        json_data = b'[]'
-        table_name = "test_table"
+    def test_convert_json_to_sqlite_non_finite_literals(self, test_db):
+        # NaN and Infinity literals are accepted, as the stdlib json module allows
+        json_data = b'[{"id": 1, "score": NaN}, {"id": 2, "score": Infinity}]'
 
-        with pytest.raises(Exception) as exc_info:
-            convert_json_to_sqlite(json_data, table_name)
+        result = convert_json_to_sqlite(json_data, "scores")
+
+        assert result['schema'] == {'id': 'INTEGER', 'score': 'REAL'}
+        assert result['sample_data'] == [{'id': 1, 'score': None}, {'id': 2, 'score': float('inf')}]
+
+    def test_convert_json_to_sqlite_non_identifier_columns(self, test_db):
+        # Characters that are not valid in SQL identifiers are replaced with underscores
+        json_data = b'[{"Unit Price ($)": 9.5, "e-mail": "a@b.com", "Qty.": 2}]'
+        table_name = "orders"
+        result = convert_json_to_sqlite(json_data, table_name)
+
+        assert set(result['schema']) == {'unit_price____', 'e_mail', 'qty_'}
+        assert result['sample_data'][0]['e_mail'] == 'a@b.com'
 
-        assert "JSON array is empty" in str(exc_info.value)
 
 
 class TestFlattenJsonObject:
     """Unit tests for flatten_json_object function"""
 
-    def test_flatten_simple_nested_object(self):
-        # Test simple nested object: {"user": {"name": "John"}}
-        obj = {"user": {"name": "John"}}
-        result = flatten_json_object(obj)
-        assert result == {"user__name": "John"}
-
-    def test_flatten_nested_arrays(self):
-        # Test nested arrays: {"tags": ["a", "b"]}
-        obj = {"tags": ["a", "b", "c"]}
-        result = flatten_json_object(obj)
-        assert result == {"tags_0": "a", "tags_1": "b", "tags_2": "c"}
-
-    def test_flatten_mixed_nesting(self):
-        # Test objects inside arrays and arrays inside objects
-        obj = {
-            "data": {
-                "items": [
-                    {"id": 1, "name": "first"},
-                    {"id": 2, "name": "second"}
-                ]
-            }
-        }
-        result = flatten_json_object(obj)
-        expected = {
-            "data__items_0__id": "1",
-            "data__items_0__name": "first",
-            "data__items_1__id": "2",
-            "data__items_1__name": "second"
-        }
-        assert result == expected
-
-    def test_flatten_empty_array(self):
-        # Test empty array
-        obj = {"tags": []}
-        result = flatten_json_object(obj)
-        assert result == {}
-
-    def test_flatten_empty_object(self):
-        # Test empty object
-        obj = {"data": {}}
-        result = flatten_json_object(obj)
-        assert result == {}
-
-    def test_flatten_null_values(self):
-        # Test null values
-        obj = {"name": "John", "age": None, "email": None}
-        result = flatten_json_object(obj)
-        assert result == {"name": "John", "age": None, "email": None}
-
-    def test_flatten_deeply_nested_structures(self):
-        # Test deeply nested structures (3+ levels)
-        obj = {
-            "level1": {
-                "level2": {
-                    "level3": {
-                        "value": "deep"
-                    }
+    @pytest.mark.parametrize("obj,expected", [
+        # Simple nested object
+        pytest.param({"user": {"name": "John"}}, {"user__name": "John"}, id="simple_nested_object"),
+        # Nested arrays
+        pytest.param(
+            {"tags": ["a", "b", "c"]},
+            {"tags_0": "a", "tags_1": "b", "tags_2": "c"},
+            id="nested_arrays"
+        ),
+        # Objects inside arrays and arrays inside objects
+        pytest.param(
+            {
+                "data": {
+                    "items": [
+                        {"id": 1, "name": "first"},
+                        {"id": 2, "name": "second"}
+                    ]
                 }
-            }
-        }
-        result = flatten_json_object(obj)
-        assert result == {"level1__level2__level3__value": "deep"}
-
-    def test_flatten_primitive_types(self):
-        # Test various primitive types
-        obj = {
-            "string": "hello",
-            "number": 42,
-            "float": 3.14,
-            "boolean": True,
-            "null": None
-        }
-        result = flatten_json_object(obj)
-        assert result["string"] == "hello"
-        assert result["number"] == "42"
-        assert result["float"] == "3.14"
-        assert result["boolean"] == "True"
-        assert result["null"] is None
-
-    def test_flatten_array_of_primitives(self):
-        # Test array with primitive values
-        obj = {"numbers": [1, 2, 3, 4, 5]}
-        result = flatten_json_object(obj)
-        expected = {
-            "numbers_0": "1",
-            "numbers_1": "2",
-            "numbers_2": "3",
-            "numbers_3": "4",
-            "numbers_4": "5"
-        }
-        assert result == expected
+            },
+            EXPECTED_MIXED,
+            id="mixed_nesting"
+        ),
+        pytest.param({"tags": []}, {}, id="empty_array"),
+        pytest.param({"data": {}}, {}, id="empty_object"),
+        pytest.param(
+            {"name": "John", "age": None, "email": None},
+            {"name": "John", "age": None, "email": None},
+            id="null_values"
+        ),
+        # Deeply nested structures (3+ levels)
+        pytest.param(
+            {"level1": {"level2": {"level3": {"value": "deep"}}}},
+            {"level1__level2__level3__value": "deep"},
+            id="deeply_nested_structures"
+        ),
+        # Primitives are stored as strings, null stays None
+        pytest.param(
+            {"string": "hello", "number": 42, "float": 3.14, "boolean": True, "null": None},
+            {"string": "hello", "number": "42", "float": "3.14", "boolean": "True", "null": None},
+            id="primitive_types"
+        ),
+        pytest.param(
+            {"numbers": [1, 2, 3, 4, 5]},
+            {"numbers_0": "1", "numbers_1": "2", "numbers_2": "3", "numbers_3": "4", "numbers_4": "5"},
+            id="array_of_primitives"
+        ),
+    ])
+    def test_flatten(self, obj, expected):
+        assert flatten_json_object(obj) == expected
+
+
+@pytest.mark.perf
+@pytest.mark.skipif(not HAS_BENCHMARK, reason="pytest-benchmark is not installed")
+class TestFlattenJsonObjectBenchmark:
+    """
+    Timing sentinels for flatten_json_object.
+
+    Deselected by default; run with -m perf. Save a baseline with
+    --benchmark-autosave, then gate later runs with
+    --benchmark-compare --benchmark-compare-fail=mean:10%
+    """
+
+    @pytest.mark.parametrize("payload", [
+        pytest.param(PAYLOAD_100, id="100_leaves"),
+        pytest.param(PAYLOAD_1000, id="1000_leaves"),
+    ])
+    def test_flatten_perf(self, benchmark, payload):
+        result = benchmark.pedantic(flatten_json_object, args=(payload,), rounds=50, iterations=100)
+        assert len(result) == len(payload["records"]) * 5
 
 
 class TestDiscoverJsonlSchema:
     """Unit tests for discover_jsonl_schema function"""
 
-    def test_discover_varying_record_structures(self):
-        # Test with records that have different fields
-        jsonl_data = b'''{"id": 1, "name": "Alice"}
+    @pytest.mark.parametrize("jsonl_data,expected", [
+        # Records that have different fields
+        pytest.param(
+            b'''{"id": 1, "name": "Alice"}
 {"id": 2, "name": "Bob", "email": "bob@example.com"}
-{"id": 3, "age": 30}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
-        assert "id" in fields
-        assert "name" in fields
-        assert "email" in fields
-        assert "age" in fields
-        assert len(fields) == 4
-
-    def test_discover_identical_fields(self):
-        # Test with all records having identical fields
-        jsonl_data = b'''{"id": 1, "name": "Alice"}
+{"id": 3, "age": 30}''',
+            {"id", "name", "email", "age"},
+            id="varying_record_structures"
+        ),
+        # All records having identical fields
+        pytest.param(
+            b'''{"id": 1, "name": "Alice"}
 {"id": 2, "name": "Bob"}
-{"id": 3, "name": "Charlie"}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
-        assert fields == {"id", "name"}
-
-    def test_discover_empty_jsonl(self):
-        # Test with empty JSONL file
-        jsonl_data = b''
-        fields = discover_jsonl_schema(jsonl_data)
-        assert len(fields) == 0
-
-    def test_discover_malformed_json_lines(self):
-        # Test with malformed JSON lines (should skip and continue)
-        jsonl_data = b'''{"id": 1, "name": "Alice"}
+{"id": 3, "name": "Charlie"}''',
+            {"id", "name"},
+            id="identical_fields"
+        ),
+        pytest.param(b'', set(), id="empty_jsonl"),
+        # Malformed JSON lines are skipped
+        pytest.param(
+            b'''{"id": 1, "name": "Alice"}
 this is not valid json
-{"id": 2, "name": "Bob"}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
-        assert "id" in fields
-        assert "name" in fields
-        assert len(fields) == 2
-
-    def test_discover_deeply_nested_structures(self):
-        # Test with deeply nested structures
-        jsonl_data = b'''{"user": {"profile": {"contact": {"email": "alice@example.com"}}}}
-{"user": {"profile": {"settings": {"theme": "dark"}}}}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
-        assert "user__profile__contact__email" in fields
-        assert "user__profile__settings__theme" in fields
-
-    def test_discover_with_arrays(self):
-        # Test with arrays
-        jsonl_data = b'''{"tags": ["python", "data"]}
-{"tags": ["javascript", "web", "frontend"]}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
+{"id": 2, "name": "Bob"}''',
+            {"id", "name"},
+            id="malformed_json_lines"
+        ),
+        pytest.param(
+            b'''{"user": {"profile": {"contact": {"email": "alice@example.com"}}}}
+{"user": {"profile": {"settings": {"theme": "dark"}}}}''',
+            {"user__profile__contact__email", "user__profile__settings__theme"},
+            id="deeply_nested_structures"
+        ),
         # Should discover all array positions used across all records
-        assert "tags_0" in fields
-        assert "tags_1" in fields
-        assert "tags_2" in fields
-
-    def test_discover_empty_lines(self):
-        # Test with empty lines or whitespace-only lines
-        jsonl_data = b'''{"id": 1}
+        pytest.param(
+            b'''{"tags": ["python", "data"]}
+{"tags": ["javascript", "web", "frontend"]}''',
+            {"tags_0", "tags_1", "tags_2"},
+            id="with_arrays"
+        ),
+        # Empty or whitespace-only lines
+        pytest.param(
+            b'''{"id": 1}
 
 {"id": 2}
 
-{"id": 3}'''
-
-        fields = discover_jsonl_schema(jsonl_data)
-        assert fields == {"id"}
+{"id": 3}''',
+            {"id"},
+            id="empty_lines"
+        ),
+    ])
+    def test_discover(self, jsonl_data, expected):
+        assert discover_jsonl_schema(jsonl_data) == expected
+
+    @pytest.mark.parametrize("records,expected", [
+        pytest.param(SAMPLE_RECORDS, SAMPLE_FIELDS, id="sample_records"),
+        pytest.param([], set(), id="no_records"),
+    ])
+    def test_discover_decoded_records(self, records, expected):
+        assert discover_record_schema(records) == expected
+
+    @pytest.mark.parametrize("loads", DECODERS)
+    def test_discover_with_decoder(self, loads):
+        # Every decoder yields the same schema, and malformed lines are still skipped
+        assert discover_jsonl_schema(SAMPLE_JSONL_BYTES, loads=loads) == SAMPLE_FIELDS
+        assert discover_jsonl_schema(b'{"id": 1}\nnot json\n{"name": "x"}', loads=loads) == {"id", "name"}
+
+    def test_discover_split_lines(self, jsonl_lines):
+        # Pre-split lines give the same schema as the raw bytes
+        assert discover_jsonl_schema(jsonl_lines) == SAMPLE_FIELDS
+        assert discover_jsonl_schema(SAMPLE_JSONL_BYTES) == SAMPLE_FIELDS
 
 
 class TestConvertJsonlToSqlite:
     """Integration tests for convert_jsonl_to_sqlite function"""
 
-    def test_convert_simple_jsonl(self, test_db, test_assets_dir):
+    def test_convert_simple_jsonl(self, test_db, asset_bytes):
         # Test with simple flat JSONL file
-        jsonl_file = test_assets_dir / "test_simple.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
-
         table_name = "simple_data"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(asset_bytes("test_simple.jsonl"), table_name)
 
         # Verify return structure
         assert result['table_name'] == table_name
-        assert 'schema' in result
-        assert 'row_count' in result
-        assert 'sample_data' in result
+        assert {'schema', 'row_count', 'sample_data'} <= result.keys()
 
         # Test the returned data
         assert result['row_count'] == 5
         assert len(result['sample_data']) == 5
 
         # Verify schema has expected columns
-        assert 'id' in result['schema']
-        assert 'name' in result['schema']
-        assert 'email' in result['schema']
-        assert 'age' in result['schema']
+        assert {'id', 'name', 'email', 'age'} <= result['schema'].keys()
 
-    def test_convert_nested_objects(self, test_db, test_assets_dir):
+    def test_convert_nested_objects(self, test_db, asset_bytes):
         # Test with nested objects
-        jsonl_file = test_assets_dir / "test_logs.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
-
         table_name = "logs"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(asset_bytes("test_logs.jsonl"), table_name)
 
         # Verify flattened column names exist
-        schema_keys = [k.lower() for k in result['schema'].keys()]
+        schema_set = {k.lower() for k in result['schema']}
 
         # Check for flattened nested fields (user.id -> user__id)
-        assert any('user__id' in k for k in schema_keys)
-        assert any('user__name' in k for k in schema_keys)
-        assert any('metadata__ip' in k or 'metadata__memory_percent' in k for k in schema_keys)
+        assert {'user__id', 'user__name'} <= schema_set
+        assert {'metadata__ip', 'metadata__memory_percent'} & schema_set
 
         # Verify row count
         assert result['row_count'] == 7
 
-    def test_convert_with_arrays(self, test_db, test_assets_dir):
+    def test_convert_with_arrays(self, test_db, asset_bytes):
         # Test with arrays
-        jsonl_file = test_assets_dir / "test_events.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
-
         table_name = "events"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(asset_bytes("test_events.jsonl"), table_name)
 
         # Verify flattened array columns exist (tags_0, tags_1, etc.)
-        schema_keys = [k.lower() for k in result['schema'].keys()]
-        assert any('tags_0' in k for k in schema_keys)
-        assert any('tags_1' in k for k in schema_keys)
-        assert any('participants_0' in k for k in schema_keys)
+        schema_set = {k.lower() for k in result['schema']}
+        assert {'tags_0', 'tags_1', 'participants_0'} <= schema_set
 
         # Verify row count
         assert result['row_count'] == 6
 
-    def test_convert_varying_fields(self, test_db, test_assets_dir):
+    def test_convert_varying_fields(self, test_db, asset_bytes):
         # Test with varying fields across records
-        jsonl_file = test_assets_dir / "test_varying_fields.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
-
         table_name = "varying_data"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(asset_bytes("test_varying_fields.jsonl"), table_name)
 
         # Verify all possible fields are in schema
-        schema_keys = [k.lower() for k in result['schema'].keys()]
-        assert 'id' in schema_keys
-        assert 'type' in schema_keys
-        assert 'title' in schema_keys
-        assert 'author' in schema_keys
+        schema_set = {k.lower() for k in result['schema']}
+        assert {'id', 'type', 'title', 'author'} <= schema_set
 
         # Some records have different optional fields
         # The schema should include all fields found across all records
@@ -430,60 +532,181 @@ class TestConvertJsonlToSqlite:
         # Verify row count
         assert result['row_count'] == 7
 
-    def test_convert_mixed_nesting(self, test_db, test_assets_dir):
+    def test_convert_mixed_nesting(self, test_db, asset_bytes):
         # Test with both nested objects and arrays
-        jsonl_file = test_assets_dir / "test_mixed.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
-
         table_name = "mixed_data"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(asset_bytes("test_mixed.jsonl"), table_name)
 
         # Verify both nested objects and arrays are flattened
-        schema_keys = [k.lower() for k in result['schema'].keys()]
+        schema_set = {k.lower() for k in result['schema']}
 
         # Check for nested object flattening
-        assert any('customer__' in k for k in schema_keys)
+        assert any(k.startswith('customer__') for k in schema_set)
 
         # Check for array flattening
-        assert any('items_0' in k or 'items_1' in k for k in schema_keys)
+        assert any(k.startswith(('items_0', 'items_1')) for k in schema_set)
 
         # Verify row count
         assert result['row_count'] == 5
 
-    def test_convert_empty_jsonl(self):
-        # Test with empty JSONL file
-        jsonl_data = b''
-        table_name = "test_table"
+    def test_convert_wide_integers_jsonl(self, test_db):
+        # Integers wider than 64 bits keep every digit instead of becoming floats
+        jsonl_data = b'{"id": 123456789012345678901234567890}\n{"id": -9223372036854775809}'
 
-        with pytest.raises(Exception) as exc_info:
-            convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(jsonl_data, "wide_ids")
 
-        assert "empty" in str(exc_info.value).lower()
+        assert [row['id'] for row in result['sample_data']] == [
+            '123456789012345678901234567890', '-9223372036854775809'
+        ]
 
-    def test_convert_invalid_jsonl(self):
-        # Test with completely invalid JSONL
-        jsonl_data = b'this is not json at all'
-        table_name = "test_table"
+    def test_convert_with_flatten_paths(self, test_db, asset_bytes):
+        # Only the requested paths become columns; the rest stays in raw_json
+        jsonl_data = asset_bytes("test_logs.jsonl")
 
-        with pytest.raises(Exception) as exc_info:
-            convert_jsonl_to_sqlite(jsonl_data, table_name)
+        table_name = "flat_logs"
+        result = convert_jsonl_to_sqlite(jsonl_data, table_name, flatten_paths={"level", "user__name", "tags_0"})
 
-        assert "Error converting JSONL to SQLite" in str(exc_info.value)
+        assert set(result['schema']) == {'level', 'user__name', 'tags_0', 'raw_json'}
+        assert result['row_count'] == 7
 
-    def test_queryable_data(self, test_db, test_assets_dir):
-        # Test that flattened data is queryable
-        jsonl_file = test_assets_dir / "test_simple.jsonl"
-        with open(jsonl_file, 'rb') as f:
-            jsonl_data = f.read()
+        first_row = result['sample_data'][0]
+        assert first_row['level'] == 'INFO'
+        assert first_row['user__name'] == 'Alice'
+        assert first_row['tags_0'] is None
+
+        # Unflattened fields remain queryable through json_extract
+        browser = test_db.execute(
+            "SELECT json_extract(raw_json, '$.metadata.browser') FROM flat_logs LIMIT 1"
+        ).fetchone()[0]
+        assert browser == 'Chrome'
+
+    def test_convert_with_flatten_paths_delimiter_in_key(self, test_db):
+        # Keys that contain the nesting delimiter select the same columns full flattening makes
+        jsonl_data = b'{"a__b": 1, "c": {"d__e": [2, 3]}, "a": {"x": 4}}\n{"a__b": null, "c": {}}\n'
+        paths = {"a__b", "c__d__e_1", "a__x"}
 
-        table_name = "queryable_data"
-        result = convert_jsonl_to_sqlite(jsonl_data, table_name)
+        result = convert_jsonl_to_sqlite(jsonl_data, "delimited_keys", flatten_paths=paths)
 
-        # Verify we can query the sample data
-        assert len(result['sample_data']) > 0
+        expected = flatten_json_object(json.loads(jsonl_data.splitlines()[0]))
         first_row = result['sample_data'][0]
+        assert {path: first_row[path] for path in paths} == {path: expected[path] for path in paths}
+        assert first_row == {'a__b': '1', 'c__d__e_1': '3', 'a__x': '4', 'raw_json': jsonl_data.splitlines()[0].decode()}
+        assert result['sample_data'][1]['a__b'] is None
 
-        # Verify the data structure is a dictionary with the expected keys
-        assert isinstance(first_row, dict)
-        assert 'id' in first_row or 'name' in first_row
\ No newline at end of file
+    def test_queryable_data(self, test_db, asset_bytes):
+        # Test that flattened data is queryable
+        table_name = "queryable_logs"
+        convert_jsonl_to_sqlite(asset_bytes("test_logs.jsonl"), table_name)
+
+        # Filter on a flattened nested column and read back other flattened columns
+        rows = test_db.execute(
+            f"SELECT user__name, metadata__browser FROM {table_name} WHERE user__role = ? ORDER BY rowid",
+            ("admin",)
+        ).fetchall()
+        assert rows == [('Alice', 'Chrome'), ('Alice', None)]
+
+
+def _exit_worker(content, table_name):
+    # Stands in for a converter whose worker process is killed mid-upload
+    os._exit(1)
+
+
+class TestConvertInWorker:
+    
+    def test_concurrent_conversions(self, test_db, asset_bytes):
+        # Run two uploads together through the pool (threads stand in for worker processes)
+        csv_data = asset_bytes("test_users.csv")
+        jsonl_data = asset_bytes("test_simple.jsonl")
+        
+        async def convert_both():
+            return await asyncio.gather(
+                convert_in_worker(convert_csv_to_sqlite, csv_data, "worker_users"),
+                convert_in_worker(convert_jsonl_to_sqlite, jsonl_data, "worker_simple")
+            )
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with patch('core.file_processor._get_converter_pool', return_value=pool):
+                users, simple = asyncio.run(convert_both())
+        
+        assert users['table_name'] == "worker_users"
+        assert simple['table_name'] == "worker_simple"
+        for result in (users, simple):
+            count = test_db.execute(f"SELECT COUNT(*) FROM {result['table_name']}").fetchone()[0]
+            assert count == result['row_count']
+
+    def test_conversion_options(self, test_db, asset_bytes):
+        # Keyword options reach the converter
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            with patch('core.file_processor._get_converter_pool', return_value=pool):
+                result = asyncio.run(convert_in_worker(
+                    convert_jsonl_to_sqlite, asset_bytes("test_logs.jsonl"), "worker_logs",
+                    flatten_paths={"level"}
+                ))
+
+        assert set(result['schema']) == {'level', 'raw_json'}
+
+    def test_conversion_in_worker_process(self, tmp_path, asset_bytes):
+        # A real one-worker spawn pool: the converter and its arguments must pickle,
+        # and the worker must write to the parent's database
+        database_path = tmp_path / "workers.db"
+        shutdown_converter_pool()
+        try:
+            with patch.object(db, 'DATABASE_PATH', str(database_path)), \
+                    patch('core.file_processor.CONVERTER_WORKERS', 1):
+                result = asyncio.run(
+                    convert_in_worker(convert_csv_to_sqlite, asset_bytes("test_users.csv"), "pool_users")
+                )
+        finally:
+            shutdown_converter_pool()
+
+        assert result['row_count'] == 4
+        conn = sqlite3.connect(database_path)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM pool_users").fetchone()[0] == 4
+        finally:
+            conn.close()
+
+    def test_broken_pool_is_replaced(self, tmp_path, asset_bytes):
+        # A worker that dies breaks its pool; the next upload gets a fresh one
+        database_path = tmp_path / "workers.db"
+        shutdown_converter_pool()
+        try:
+            with patch.object(db, 'DATABASE_PATH', str(database_path)), \
+                    patch('core.file_processor.CONVERTER_WORKERS', 1):
+                with pytest.raises(BrokenProcessPool):
+                    asyncio.run(convert_in_worker(_exit_worker, b"", "crashed"))
+                result = asyncio.run(
+                    convert_in_worker(convert_csv_to_sqlite, asset_bytes("test_users.csv"), "pool_users")
+                )
+        finally:
+            shutdown_converter_pool()
+
+        assert result['row_count'] == 4
+
+
+class TestConversionErrors:
+    """Error paths shared by the convert_*_to_sqlite functions"""
+
+    @pytest.mark.parametrize("converter,payload,kwargs,needle", [
+        # CSV rows with inconsistent lengths fail with and without type inference
+        pytest.param(convert_csv_to_sqlite, INVALID_CSV_BYTES, {}, "Error converting CSV to SQLite",
+                     id="csv_inconsistent_data"),
+        pytest.param(convert_csv_to_sqlite, INVALID_CSV_BYTES, {"infer_types": False}, "Error converting CSV to SQLite",
+                     id="csv_without_type_inference_inconsistent_data"),
+        pytest.param(convert_json_to_sqlite, b'invalid json', {}, "Error converting JSON to SQLite",
+                     id="json_invalid"),
+        pytest.param(convert_json_to_sqlite, b'{"name": "John", "age": 25}', {}, "JSON must be an array of objects",
+                     id="json_not_array"),
+        pytest.param(convert_json_to_sqlite, b'[]', {}, "JSON array is empty",
+                     id="json_empty_array"),
+        pytest.param(convert_jsonl_to_sqlite, b'', {}, "JSONL file is empty",
+                     id="jsonl_empty"),
+        pytest.param(convert_jsonl_to_sqlite, b'this is not json at all', {}, "Error converting JSONL to SQLite",
+                     id="jsonl_invalid"),
+        # A malformed first record fails fast instead of parsing the rest of the file
+        pytest.param(convert_jsonl_to_sqlite, b'\nnot json\n{"id": 1}\n{"id": 2}', {}, "Line 2 is not valid JSON",
+                     id="jsonl_malformed_first_line"),
+    ])
+    def test_error_paths(self, test_db, converter, payload, kwargs, needle):
+        with pytest.raises(Exception, match=needle):
+            converter(payload, "test_table", **kwargs)